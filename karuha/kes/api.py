@@ -4,7 +4,7 @@ from .root import get_root_net
 
 def kes_init() -> None:
     root = get_root_net()
-    root.send_message(root, kes_msg.NodeInitializeMessage())
+    root.send_message(root, kes_msg.INITIALIZE_MESSAGE)
 
 
 def kes_finalize(*, force: bool = False) -> None:
@@ -12,4 +12,4 @@ def kes_finalize(*, force: bool = False) -> None:
     if force:
         root.drop()
     else:
-        root.send_message(root, kes_msg.NodeFinalizeMessage())
+        root.send_message(root, kes_msg.FINALIZE_MESSAGE)
@@ -1,5 +1,5 @@
-from typing import Iterator, NoReturn, Union
-from weakref import ref, ReferenceType, WeakValueDictionary
+from typing import Iterator, List, NoReturn, Union
+from weakref import finalize, ref, ReferenceType, WeakValueDictionary
 
 from ..core import BaseNode, Network, on, kes_msg, kes_evt, kes_exc
 from ..core import network
@@ -33,31 +33,47 @@ class _PhantomRecord:
 
 
 class PhantomNetworkManager(AbstractRecordManager):
-    __slots__ = ["_nodes", "_count"]
+    __slots__ = ["_nodes", "_count", "_free_ids"]
 
     def __init__(self) -> None:
         super().__init__()
         self._nodes: WeakValueDictionary[int, BaseNode] = WeakValueDictionary()
         self._count = 0
+        self._free_ids: List[int] = []
     
     def get(self, nid: int) -> _PhantomRecord:
-        if nid not in self._nodes:
-            kes_exc.RuntimeError(f"there is no node with id {nid}").throw()
-        node = self._nodes[nid]
-        return _PhantomRecord(node)
+        return _PhantomRecord(self.get_node(nid))
+    
+    def get_node(self, nid: int) -> BaseNode:
+        node = self._nodes.get(nid)
+        if node is None:
+            kes_exc.RuntimeError(("there is no node with id {}", nid)).throw()
+        return node
     
     def new(self, node: BaseNode) -> int:
-        count = self._count
-        self._nodes[count] = node
-        self._count += 1
-        return count
+        if self._free_ids:
+            nid = self._free_ids.pop()
+        else:
+            nid = self._count
+            self._count += 1
+        self._nodes[nid] = node
+        finalize(node, self._free_ids.append, nid)
+        node.nid = nid
+        return nid
 
     def drop(self, nid: int) -> BaseNode:
-        node = self.get(nid).node
-        return node
+        return self.get_node(nid)
+    
+    def disconnect(self, nid: int) -> None:
+        pass
 
     def __iter__(self) -> Iterator[_PhantomRecord]:
-        yield from map(_PhantomRecord, self._nodes.valuerefs())
+        for i in self._nodes.valuerefs():
+            if i() is not None:
+                yield _PhantomRecord(i)
+    
+    def __len__(self) -> int:
+        return len(self._nodes)
 
 
 @builtin_node("phantom_net")
@@ -65,6 +81,8 @@ class PhantomNetwork(Network):
     __slots__ = ["nid"]
 
     records: PhantomNetworkManager
+    is_phantom = True
+    inbox_size = 4096
 
     def __init__(self, net: Network) -> None:
         super().__init__(net)
@@ -78,5 +96,13 @@ class PhantomNetwork(Network):
     def on_node_drop(self, event: kes_evt.Event) -> None:
         pass
 
+    def _inbox_overflow(self, message: kes_msg.Message, /) -> None:
+        if isinstance(message, kes_evt.NodeTransferEvent):
+            # the source network has already released the node,
+            # so the transfer cannot be dropped
+            self._node_receive(message.node)
+            return
+        super()._inbox_overflow(message)
+
 
-network.phantom_net_factory = lambda: get_root_net()._get_port("phantom_net")
+network.phantom_net_factory = lambda: get_root_net().port_read("phantom_net")
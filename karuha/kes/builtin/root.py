@@ -1,5 +1,5 @@
 import asyncio
-from typing import Callable, Dict, Type, TypeVar
+from typing import Callable, ClassVar, Dict, Optional, Tuple, Type, TypeVar
 
 from ..core import BaseNode, Network, HandlerFlag, on, kes_evt, kes_exc
 
@@ -11,11 +11,15 @@ class RootNetwork(Network):
     __slots__ = []
 
     __builtin_node__: Dict[str, Type[BaseNode]] = {}
+    _builtin_items: ClassVar[Optional[Tuple[Tuple[str, Type[BaseNode]], ...]]] = None
     
     def __init__(self) -> None:
         super().__init__(self)
         self.records.new(self)
-        for k, v in self.__builtin_node__.items():
+        items = RootNetwork._builtin_items
+        if items is None:
+            items = RootNetwork._builtin_items = tuple(self.__builtin_node__.items())
+        for k, v in items:
             node = self._node_alloc(v)
             self._export(k, nid=node.nid)
 
@@ -49,5 +53,6 @@ def get_root_net() -> RootNetwork:
 def builtin_node(name: str) -> Callable[[_T_NodeCls], _T_NodeCls]:
     def inner(cls: _T_NodeCls) -> _T_NodeCls:
         RootNetwork.__builtin_node__[name] = cls
+        RootNetwork._builtin_items = None
         return cls
     return inner
@@ -16,4 +16,4 @@ class TempNetwork(Network):
  
 
 def get_temp_net() -> TempNetwork:
-    return get_root_net()._get_port("temp_net")
+    return get_root_net().port_read("temp_net")
@@ -1,6 +1,7 @@
 from copy import copy
 from enum import Enum, auto
-from typing import Any, ClassVar, Tuple, Type
+from itertools import count
+from typing import Any, ClassVar, List, Type
 from typing_extensions import Self
 
 from .message import Message
@@ -13,21 +14,36 @@ class EventMode(Enum):
     FORCE_PROPAGATE = auto()
 
 
+_event_id_counter = count()
+
+
 class Event(Message):
     __slots__ = ["traceback"]
 
     mode: ClassVar[EventMode] = EventMode.IGNORE
+    _event_id: ClassVar[int] = next(_event_id_counter)
 
     def __init__(self) -> None:
         super().__init__()
-        self.traceback: Tuple["Network", ...] = ()
+        self.traceback: List["Network"] = []
 
     def send(self) -> None:
         get_curr_node().send_event(self)
     
     def add_traceback(self, net: "Network") -> Self:
+        self.traceback.append(net)
+        return self
+    
+    def pop_traceback(self) -> "Network":
+        return self.traceback.pop()
+    
+    def snapshot(self) -> Self:
+        """copy the event together with its current traceback
+
+        Used for subscribers handling the event after the network has popped its hop.
+        """
         ne = copy(self)
-        ne.traceback = self.traceback + (net,)
+        ne.traceback = self.traceback.copy()
         return ne
     
     @property
@@ -36,6 +52,10 @@ class Event(Message):
 
     def __repr__(self) -> str:
         return f"<{self.__class__.__qualname__} event>"
+    
+    def __init_subclass__(cls) -> None:
+        super().__init_subclass__()
+        cls._event_id = next(_event_id_counter)
 
 
 class NetworkInitializeEvent(Event):
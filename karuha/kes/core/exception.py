@@ -1,21 +1,32 @@
 import asyncio
 import builtins
-from typing import List, NoReturn, Optional
+from typing import Any, NoReturn, Optional, Tuple, Union
 
 from .event import Event, EventMode
 
 
 class Exception(Event):
-    __slots__ = ["text", "src_node", "src_message", "traceback"]
+    __slots__ = ["_text", "src_node", "src_message"]
 
     mode = EventMode.PROPAGATE
 
-    def __init__(self, text: str, /) -> None:
+    def __init__(self, text: Union[str, Tuple[Any, ...]], /) -> None:
+        """
+        :param text: the error text, or a tuple of a format string and its arguments
+                     which is formatted only when the text is accessed
+        """
         super().__init__()
-        self.text = text
-        self.src_node = get_curr_node()
-        self.src_message = get_curr_message()
-        self.traceback: List["Network"] = []
+        self._text = text
+        self.src_node = node = var_node.get()
+        self.src_message = node._curr_message if node is not None else None
+    
+    @property
+    def text(self) -> str:
+        text = self._text
+        if not isinstance(text, str):
+            fmt, *args = text
+            text = self._text = fmt.format(*args)
+        return text
     
     def throw(self) -> NoReturn:
         self.send()
@@ -25,7 +36,7 @@ class Exception(Event):
 class PortError(Exception):
     __slots__ = ["name"]
 
-    def __init__(self, text: str, /, name: str) -> None:
+    def __init__(self, text: Union[str, Tuple[Any, ...]], /, name: str) -> None:
         super().__init__(text)
         self.name = name
 
@@ -58,5 +69,4 @@ class NodeCancelledError(asyncio.CancelledError):
         self.exc_message = exc
 
 
-from .node import get_curr_node, get_curr_message
-from .network import Network
+from .node import var_node
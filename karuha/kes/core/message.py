@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Final
 from typing_extensions import Self
 
 
@@ -6,7 +6,10 @@ class Message(object):
     __slots__ = []
 
     def __rshift__(self, node: "BaseNode") -> Self:
-        get_curr_node().send_message(node, self)
+        sender = var_node.get()
+        if sender is None:
+            raise RuntimeError("not in the KES runtime")
+        sender.send_message(node, self)
         return self
     
     def __repr__(self) -> str:
@@ -17,7 +20,6 @@ class DataMessage(Message):
     __slots__ = ["data"]
 
     def __init__(self, /, data: Any) -> None:
-        super().__init__()
         self.data = data
 
     def __repr__(self) -> str:
@@ -36,7 +38,6 @@ class ReflectMessage(Message):
     __slots__ = ["target", "raw"]
 
     def __init__(self, /, target: "BaseNode", message: Message) -> None:
-        super().__init__()
         self.target = target
         self.raw = message
     
@@ -70,4 +71,8 @@ class PortExportAttr(PortAction):
     __slots__ = []
 
 
-from .node import BaseNode, get_curr_node
+INITIALIZE_MESSAGE: Final = NodeInitializeMessage()
+FINALIZE_MESSAGE: Final = NodeFinalizeMessage()
+
+
+from .node import BaseNode, var_node
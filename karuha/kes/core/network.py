@@ -1,9 +1,5 @@
-import gc
-from collections import defaultdict
-from contextlib import suppress
-from typing import (List, Literal, NoReturn, Optional, Type, TypeVar, Union,
-                    overload)
-from weakref import ref
+from typing import (ClassVar, Dict, List, Literal, NoReturn, Optional, Sequence, Type,
+                    TypeVar, Union, overload)
 
 from . import event as kes_evt
 from . import exception as kes_exc
@@ -26,7 +22,7 @@ class RecordPort(AbstractPort):
     
     def get(self, /) -> BaseNode:
         super().get()
-        return self.node.records.get(self.nid).node
+        return self.node.records.get_node(self.nid)
     
     def set(self, node: BaseNode, /) -> None:
         node.throw(
@@ -38,15 +34,17 @@ class RecordPort(AbstractPort):
 
 
 class Network(Node):
-    __slots__ = ["records", "event_map", "stopping"]
+    __slots__ = ["records", "event_map", "stopping", "_dispatch_cache"]
 
     records: AbstractRecordManager
+    is_phantom: ClassVar[bool] = False
 
     def __init__(self, net: "Network") -> None:
         super().__init__(net)
         self.records = RecordManager()
-        self.event_map = defaultdict(list)
+        self.event_map: List[List[BaseNode]] = []
         self.stopping = False
+        self._dispatch_cache: Dict[Type[kes_evt.Event], List[BaseNode]] = {}
     
     def node_new(self, type: Type[BaseNode], *args, **kwds) -> None:
         self.send_event_inner(
@@ -68,25 +66,36 @@ class Network(Node):
     
     @on(kes_evt.Event)
     def on_event(self, event: kes_evt.Event) -> None:
-        handled = False
-        e = event.add_traceback(self)
-        for tp in event.__class__.__mro__:
-            if tp not in self.event_map:
-                continue
-            handled = True
-            for i in self.event_map[tp]:
-                self.send_message(i, e)
-        if (not handled and kes_evt.EventMode.PROPAGATE == event.mode) or kes_evt.EventMode.FORCE_PROPAGATE == event.mode:
-            return self.send_event(event)
-        elif not handled and kes_evt.EventMode.THROW_ERR == event.mode:
-            self.throw(kes_exc.UnsupportedMessageError(f"unsupported event {event}"))
+        subscribers = self._subscribers(event.__class__)
+        send = self.send_message
+        # the hop is only recorded during the synchronous fan-out,
+        # queued subscribers share a snapshot of the traceback
+        event.add_traceback(self)
+        snapshot = None
+        try:
+            for i in subscribers:
+                if i.try_handle_inline(event):
+                    continue
+                if snapshot is None:
+                    snapshot = event.snapshot()
+                send(i, snapshot)
+        finally:
+            event.pop_traceback()
+        mode = event.mode
+        if subscribers:
+            if mode is kes_evt.EventMode.FORCE_PROPAGATE:
+                send(self.net, event)
+        elif mode is kes_evt.EventMode.PROPAGATE or mode is kes_evt.EventMode.FORCE_PROPAGATE:
+            send(self.net, event)
+        elif mode is kes_evt.EventMode.THROW_ERR:
+            self.throw(kes_exc.UnsupportedMessageError(("unsupported event {}", event)))
     
     @on(kes_evt.NodeNewEvent, flag=HandlerFlag.PROPAGATE)
     def on_node_new(self, event: kes_evt.NodeNewEvent) -> None:
         if self.stopping:
             kes_exc.RuntimeError("cannot alloc node when the network was stopping").throw()
         node = self._node_alloc(event.type, *event.args, **event.kwargs)
-        node.send_message(node, kes_msg.NodeInitializeMessage())
+        node.send_message(node, kes_msg.INITIALIZE_MESSAGE)
     
     @on(kes_evt.NodeDropEvent, flag=HandlerFlag.PROPAGATE)
     def on_node_drop(self, event: kes_evt.NodeDropEvent) -> None:
@@ -101,8 +110,7 @@ class Network(Node):
     
     @on(kes_evt.NetworkInitializeEvent, flag=HandlerFlag.PROPAGATE)
     def on_net_initialize(self, event: kes_evt.NetworkInitializeEvent) -> None:
-        for i in self.records:
-            i.node.send_message_inner(kes_msg.NodeInitializeMessage())
+        self._broadcast_inner(kes_msg.INITIALIZE_MESSAGE)
     
     @on(kes_evt.NetworkFinalizeEvent, flag=HandlerFlag.PROPAGATE)
     def on_net_finalize(self, event: kes_evt.NetworkFinalizeEvent) -> None:
@@ -110,11 +118,10 @@ class Network(Node):
         if not self.records:
             self.drop()
             return
-        for i in self.records:
-            self.send_message(i.node, kes_msg.NodeFinalizeMessage())
+        self._broadcast_inner(kes_msg.FINALIZE_MESSAGE)
 
     def send_event_inner(self, event: kes_evt.Event) -> None:
-        self.send_message_inner(event)
+        self.send_message(self, event)
     
     @overload
     def throw_inner(self, exception: "kes_exc.Exception", *, cancel: Literal[False]) -> None: ...
@@ -128,6 +135,13 @@ class Network(Node):
     
     send_exception_inner = throw_inner
 
+    def _broadcast_inner(self, message: kes_msg.Message) -> None:
+        send = self.send_message
+        for i in self.records:
+            node = i.node
+            if not node.try_handle_inline(message):
+                send(node, message)
+
     def _node_alloc(self, node: Type[T_Node], *args, **kwds) -> T_Node:
         node_ins = node(self, *args, **kwds)
         nid = self.records.new(node_ins)
@@ -136,19 +150,12 @@ class Network(Node):
     
     def _node_dealloc(self, nid: int, *, disconnect: bool = False) -> None:
         if disconnect:
-            for i in self.records:
-                with suppress(kes_exc.NodeCancelledError):
-                    i.next.discard(nid)
+            self.records.disconnect(nid)
         phantom_net = phantom_net_factory()
         if phantom_net is not None:
             self._node_transfer(nid, phantom_net)
             return
-        n_ref = ref(self.records.drop(nid))
-        gc.collect()
-        if (node := n_ref) is not None:
-            self.throw_inner(
-                kes_exc.RuntimeError(f"the node {node!r} has additional references and cannot be released")
-            )
+        self.records.drop(nid)
     
     def _node_transfer(self, nid: int, target: "Network") -> None:
         node = self.records.drop(nid)
@@ -162,11 +169,11 @@ class Network(Node):
         node.net = self
         node.nid = nid
     
-    def _record_next(self, nid: int) -> List[BaseNode]:
-        return [self.records.get(i).node for i in self.records.get(nid).next]
+    def _record_next(self, nid: int) -> Sequence[BaseNode]:
+        return self.records.next_nodes(nid)
     
     def _connect(self, s_id: int, t_id: int) -> None:
-        self.records.get(s_id).next.add(t_id)
+        self.records.connect(s_id, t_id)
     
     def _export(
             self,
@@ -181,14 +188,39 @@ class Network(Node):
         return super()._export(name_or_port, flag)
     
     def _register_event(self, event: Type[kes_evt.Event], node: BaseNode) -> None:
-        self.event_map[event].append(node)
+        event_map = self.event_map
+        while len(event_map) <= event._event_id:
+            event_map.append([])
+        event_map[event._event_id].append(node)
+        self._dispatch_cache.clear()
     
     def _unregister_event(self, event: Type[kes_evt.Event], node: BaseNode) -> None:
-        if node not in self.event_map[event]:
+        eid = event._event_id
+        if eid >= len(self.event_map) or node not in self.event_map[eid]:
             self.throw_inner(
-                kes_exc.ValueError(f"unregistered node {node}")
+                kes_exc.ValueError(("unregistered node {}", node))
             )
-        self.event_map[event].remove(node)
+        self.event_map[eid].remove(node)
+        self._dispatch_cache.clear()
+    
+    def _subscribers(self, event: Type[kes_evt.Event]) -> List[BaseNode]:
+        subscribers = self._dispatch_cache.get(event)
+        if subscribers is None:
+            subscribers = self._build_dispatch(event)
+        return subscribers
+    
+    def _build_dispatch(self, event: Type[kes_evt.Event]) -> List[BaseNode]:
+        event_map = self.event_map
+        size = len(event_map)
+        subscribers = []
+        for tp in event.__mro__:
+            if not issubclass(tp, kes_evt.Event):
+                continue
+            eid = tp._event_id
+            if eid < size:
+                subscribers.extend(event_map[eid])
+        self._dispatch_cache[event] = subscribers
+        return subscribers
     
     def __repr__(self) -> str:
         return f"<{self.__class__.__qualname__} net in net {self.net!r} at 0x{id(self):016X}>"
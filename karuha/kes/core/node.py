@@ -1,74 +1,130 @@
 import asyncio
+import inspect
+import sys
 from abc import ABC, abstractmethod
 from asyncio import iscoroutinefunction
-from contextlib import suppress
+from collections import ChainMap, deque
 from contextvars import ContextVar
 from enum import IntFlag, auto
 from inspect import signature
 from types import MethodType
-from typing import (Any, Callable, ClassVar, Coroutine, Dict, Generic, Literal,
-                    NoReturn, Optional, Set, Type, TypeVar, Union, get_args,
-                    overload)
+from typing import (Any, Awaitable, Callable, ClassVar, Coroutine, Deque,
+                    Dict, Generic, Literal, NoReturn, Optional, Set,
+                    Tuple, Type, TypeVar, Union, get_args, overload)
 
 from typing_extensions import Self, Annotated, _AnnotatedAlias
 
-from .message import (DataMessage, Message, NodeFinalizeMessage,
-                      NodeInitializeMessage, PortGet, PortSet, ReflectMessage)
+from .message import (FINALIZE_MESSAGE, INITIALIZE_MESSAGE, DataMessage,
+                      Message, NodeFinalizeMessage, NodeInitializeMessage,
+                      PortGet, PortSet, ReflectMessage)
 
 
 T_co = TypeVar("T_co", covariant=True)
 T_Message = TypeVar("T_Message", bound=Message)
 T_Node = TypeVar("T_Node", bound="Node", covariant=True)
 
-var_node = ContextVar["BaseNode"]("node")
-var_message = ContextVar["Message"]("message")
+var_node = ContextVar[Optional["BaseNode"]]("node", default=None)
 
-
-async def prepare_and_exec(node: "BaseNode", message: Message) -> None:
-    var_node.set(node)
-    var_message.set(message)
-    try:
-        await node.__handle_message__(message)
-    except Exception as e:
-        raise kes_exc.NodeCancelledError(
-            "uncaught exception",
-            exc=kes_exc.PyKernelError(e)
-        ) from e
+# number of messages a node worker handles before yielding to the event loop
+DRAIN_YIELD_INTERVAL = 64
 
 
 def get_curr_node() -> "BaseNode":
-    try:
-        return var_node.get()
-    except LookupError as e:
-        raise RuntimeError("not in the KES runtime") from e
+    node = var_node.get()
+    if node is None:
+        raise RuntimeError("not in the KES runtime")
+    return node
 
 
 def get_curr_message() -> Message:
-    try:
-        return var_message.get()
-    except LookupError as e:
-        raise RuntimeError("not in the KES runtime") from e
+    node = var_node.get()
+    message = node._curr_message if node is not None else None
+    if message is None:
+        raise RuntimeError("not in the KES runtime")
+    return message
 
 
 class BaseNode(object):
-    __slots__ = ["net", "nid", "__weakref__"]
+    __slots__ = ["net", "nid", "_inbox", "_worker", "_curr_message", "__weakref__"]
 
     net: "Network"
     nid: int
+    # maximum number of pending messages, the oldest one is passed to
+    # _inbox_overflow when exceeded
+    inbox_size: ClassVar[Optional[int]] = None
 
     def __init__(self, net: "Network", /) -> None:
         self.net = net
+        self._inbox: Deque[Message] = deque(maxlen=self.inbox_size)
+        self._worker: Optional[asyncio.Task] = None
+        # the message being handled, kept on the node rather than in a context var
+        # so that the worker does not pay a ContextVar.set per message
+        self._curr_message: Optional[Message] = None
     
     @staticmethod
     def send_message(target: "BaseNode", message: Message, /) -> None:
-        asyncio.create_task(prepare_and_exec(target, message))
+        inbox = target._inbox
+        if len(inbox) == inbox.maxlen:
+            target._inbox_overflow(inbox.popleft())
+        inbox.append(message)
+        if target._worker is None:
+            target._worker = asyncio.create_task(target._drain())
+    
+    async def _drain(self) -> None:
+        # The worker only lives while there are pending messages,
+        # so an idle node holds no reference from the event loop.
+        inbox = self._inbox
+        count = 0
+        var_node.set(self)
+        try:
+            while inbox:
+                message = inbox.popleft()
+                self._curr_message = message
+                try:
+                    pending = self.handle_message(message)
+                    if pending is not None:
+                        await pending
+                except kes_exc.NodeCancelledError:
+                    pass
+                except Exception as e:
+                    self._report_error(e)
+                count += 1
+                if count % DRAIN_YIELD_INTERVAL == 0:
+                    await asyncio.sleep(0)
+        finally:
+            self._curr_message = None
+            self._worker = None
+    
+    def _inbox_overflow(self, message: Message, /) -> None:
+        """called with the oldest pending message when it is evicted from a full inbox"""
+        logger.warning(f"inbox of {self!r} is full, dropping {message!r}")
+    
+    def _report_error(self, exception: Exception, /) -> None:
+        # called from the except block, so the traceback is logged as well
+        logger.exception(f"uncaught exception in {self!r}")
+        self.throw(kes_exc.PyKernelError(exception), cancel=False)
     
     def send_message_inner(self, message: Message, /) -> None:
         self.send_message(self, message)
     
+    def handle_message(self, message: Message, /) -> Optional[Awaitable[None]]:
+        """handle the message in the current context
+
+        Return an awaitable if the message cannot be handled synchronously.
+        """
+        return self.__handle_message__(message)
+    
+    def try_handle_inline(self, message: Message, /) -> bool:
+        """handle the message synchronously if no task is needed
+
+        Return False if the message should be queued by `send_message` instead.
+        """
+        return False
+    
     def pass_down(self, message: Message, /) -> None:
+        send = self.send_message
         for i in self.net._record_next(self.nid):
-            self.send_message(i, message)
+            send(i, message)
     
     def send_event(self, event: "Event", /) -> None:
         self.send_message(self.net, event)
@@ -79,7 +135,8 @@ class BaseNode(object):
     def throw(self, exception: "kes_exc.Exception", *, cancel: Literal[True] = True) -> NoReturn: ...
 
     def throw(self, exception: "kes_exc.Exception", *, cancel: bool = True) -> None:
-        self.send_event(exception)
+        # inlined send_event, this is on every error path
+        self.send_message(self.net, exception)
         if cancel:
             raise kes_exc.NodeCancelledError(exc=exception)
     
@@ -101,18 +158,20 @@ class PortFlag(IntFlag):
 
 
 class AbstractPort(ABC, Generic[T_co]):
-    __slots__ = ["node", "name", "flag"]
+    __slots__ = ["node", "name", "flag", "readable", "writable"]
 
     def __init__(self, node: BaseNode, name: str, /, flag: PortFlag = PortFlag.DEFAULT) -> None:
         super().__init__()
         self.node = node
         self.name = name
         self.flag = flag
+        self.readable = PortFlag.READABLE in flag
+        self.writable = PortFlag.WRITABLE in flag
 
     @abstractmethod
     def get(self, /) -> T_co:
         node = self.node
-        if PortFlag.READABLE not in self.flag:
+        if not self.readable:
             node.throw(
                 kes_exc.PortError(
                     f"port {self.name} is not readable",
@@ -123,7 +182,7 @@ class AbstractPort(ABC, Generic[T_co]):
     @abstractmethod
     def set(self, value: T_co, /) -> None:  # type: ignore
         node = self.node
-        if PortFlag.WRITABLE not in self.flag:
+        if not self.writable:
             node.throw(
                 kes_exc.PortError(
                     f"port {self.name} is not writable",
@@ -152,7 +211,10 @@ class HandlerFlag(IntFlag):
 
 
 class MessageHandler(Generic[T_Message]):
-    __slots__ = ["__func__", "flag", "_message_type", "__orig_class__"]
+    __slots__ = [
+        "__func__", "flag", "is_async", "send_ret", "reflective", "propagate",
+        "_message_type", "__orig_class__"
+    ]
 
     def __init__(
             self,
@@ -163,13 +225,19 @@ class MessageHandler(Generic[T_Message]):
     ) -> None:
         self.__func__ = func
         self.flag = flag
+        self.is_async = iscoroutinefunction(func)
+        self.send_ret = HandlerFlag.SEND_RET in flag
+        self.reflective = HandlerFlag.REFLECTIVE in flag
+        self.propagate = HandlerFlag.PROPAGATE in flag
         if message_type is not None:
             self._message_type = message_type
     
     @property
     def message_type(self) -> Type[T_Message]:
-        with suppress(AttributeError):
+        try:
             return self._message_type
+        except AttributeError:
+            pass
         
         message_type: T_Message
         try:
@@ -203,12 +271,16 @@ class MessageHandler(Generic[T_Message]):
     
     async def __call__(self, node: "Node", message: T_Message) -> Any:
         ret = self.__func__(node, message)
-        if iscoroutinefunction(self.__func__):
+        if self.is_async:
             ret = await ret
         return ret
 
 
 Export = Annotated[T_co, AttrPort[T_co]]
+# the metadata tuple is shared by every subscription of Export
+_EXPORT_METADATA = Export.__metadata__
+
+HandlerChain = Tuple[Tuple[Type[Message], MessageHandler], ...]
 
 
 def on(
@@ -220,70 +292,185 @@ def on(
     def inner(func: Callable[[T_Node, T_Message], Any]):
         if isinstance(func, MessageHandler):
             func = func.__func__
-        handler = MessageHandler[message](func, flag=flag)  # type: ignore
+        handler = MessageHandler(func, flag=flag, message_type=message)
         if node is not None:
             node.__message_handler__[message] = handler
+            _clear_handler_cache(node)
         return handler
     return inner
 
 
+def _clear_handler_cache(cls: Type["Node"]) -> None:
+    # subclasses read the handler map of their bases through a ChainMap,
+    # so their cached chains are stale as well
+    cls.__message_handler_cache__.clear()
+    for i in cls.__subclasses__():
+        _clear_handler_cache(i)
+
+
+def _own_annotations(cls: type) -> Dict[str, Any]:
+    if sys.version_info >= (3, 10):
+        # also covers the lazily evaluated annotations of Python 3.14
+        return inspect.get_annotations(cls)
+    return cls.__dict__.get("__annotations__", {})
+
+
 class Node(BaseNode):
     __slots__ = ["port_map"]
 
     __export_attr__: ClassVar[Set[str]] = set()
-    __message_handler__: ClassVar[Dict[Type[Message], MessageHandler]]
+    # handlers defined by the class itself in the first map, followed by those of its bases
+    __message_handler__: ClassVar["ChainMap[Type[Message], MessageHandler]"]
+    # message type -> (handler chain, whether all handlers in the chain are sync,
+    #                  whether the message type is a reflect wrapper)
+    __message_handler_cache__: ClassVar[Dict[Type[Message], Tuple[HandlerChain, bool, bool]]] = {}
+    # set for subclasses overriding __handle_message__, every message is routed through it
+    _custom_handle_message: ClassVar[bool] = False
 
     def __init__(self, net: "Network", /) -> None:
-        self.net = net
+        super().__init__(net)
         self.port_map: Dict[str, AbstractPort] = {i: AttrPort(self, i) for i in self.__export_attr__}
     
     def initialize(self) -> None:
-        self.send_message(self, NodeInitializeMessage())
+        self.send_message(self, INITIALIZE_MESSAGE)
     
     def finalize(self) -> None:
-        self.send_message(self, NodeFinalizeMessage())
+        self.send_message(self, FINALIZE_MESSAGE)
     
     def drop(self) -> None:
         self.send_event(NodeDropEvent(self.nid))
 
     async def __handle_message__(self, message: "Message", /, *, raise_for_unsupported: bool = True) -> None:
-        if self.net is network.phantom_net_factory():
+        if self.net.is_phantom:
             self.throw(kes_exc.RuntimeError("phantom node does not receive messages"))
         
-        if isinstance(message, ReflectMessage):
-            target = message.target
-            message = message.raw
-        else:
-            target = None
-        handled = not raise_for_unsupported
-        for tp in message.__class__.__mro__:
+        handlers, _, raw, target = self._prepare_dispatch(message)
+        if handlers:
+            pending = self._exec_handlers(handlers, raw, target)
+            if pending is not None:
+                await pending
+        elif raise_for_unsupported:
+            self.throw(
+                kes_exc.UnsupportedMessageError(
+                    "unhandlable message"
+                )
+            )
+    
+    def handle_message(self, message: Message, /) -> Optional[Awaitable[None]]:
+        if self._custom_handle_message:
+            return self.__handle_message__(message)
+        handlers, sync, raw, target = self._prepare_dispatch(message)
+        if not (handlers and sync) or self.net.is_phantom:
+            return self.__handle_message__(message)
+        self._exec_handlers(handlers, raw, target)
+    
+    def try_handle_inline(self, message: Message, /) -> bool:
+        if self._custom_handle_message or self._worker is not None or self._inbox or self.net.is_phantom:
+            return False
+        handlers, sync, raw, target = self._prepare_dispatch(message)
+        if not (handlers and sync):
+            return False
+        
+        node_token = var_node.set(self)
+        prev_message = self._curr_message
+        self._curr_message = message
+        try:
+            self._exec_handlers(handlers, raw, target)
+        except kes_exc.NodeCancelledError:
+            pass
+        except Exception as e:
+            self._report_error(e)
+        finally:
+            self._curr_message = prev_message
+            var_node.reset(node_token)
+        return True
+    
+    def _prepare_dispatch(self, message: Message) -> Tuple[HandlerChain, bool, Message, Optional[BaseNode]]:
+        """resolve the handler chain of a message
+
+        Reflect messages are unwrapped, returning the chain of the wrapped message
+        together with the node its results are sent to.
+        """
+        handlers, sync, reflect = self._resolve_handlers(message.__class__)
+        if not reflect:
+            return handlers, sync, message, None
+        raw = message.raw  # type: ignore
+        handlers, sync, _ = self._resolve_handlers(raw.__class__)
+        return handlers, sync, raw, message.target  # type: ignore
+    
+    @classmethod
+    def _resolve_handlers(cls, message_type: Type[Message]) -> Tuple[HandlerChain, bool, bool]:
+        cache = cls.__message_handler_cache__
+        cached = cache.get(message_type)
+        if cached is not None:
+            return cached
+        if issubclass(message_type, ReflectMessage):
+            cached = cache[message_type] = ((), True, True)
+            return cached
+        handler_map = cls.__message_handler__
+        handlers = []
+        for tp in message_type.__mro__:
             if tp is object:
                 break
-            hdl = self.__message_handler__.get(tp)
+            hdl = handler_map.get(tp)
             if hdl is None:
                 continue
-            ret = await hdl(self, message)
-            handled = True
-            if HandlerFlag.SEND_RET in hdl.flag:
-                data = DataMessage(ret)
-                if target is not None:
-                    if HandlerFlag.REFLECTIVE not in hdl.flag:
-                        self.throw(
-                            kes_exc.UnsupportedMessageError(
-                                f"{tp} is not reflective"
-                            )
-                        )
-                    self.send_message(target, data)
-                else:
-                    self.pass_down(data)
-            if HandlerFlag.PROPAGATE not in hdl.flag:
+            handlers.append((tp, hdl))
+            if not hdl.propagate:
                 break
-        if not handled:
-            self.throw(
-                kes_exc.UnsupportedMessageError(
-                    "unhandlable message"
+        cached = cache[message_type] = (
+            tuple(handlers),
+            not any(hdl.is_async for _, hdl in handlers),
+            False
+        )
+        return cached
+    
+    def _exec_handlers(
+            self,
+            handlers: HandlerChain,
+            message: Message,
+            target: Optional[BaseNode]
+    ) -> Optional[Awaitable[None]]:
+        """run the handler chain
+
+        Return an awaitable finishing the chain if an async handler is reached,
+        a fully sync chain is run to the end and returns None.
+        """
+        for i, (tp, hdl) in enumerate(handlers):
+            ret = hdl.__func__(self, message)
+            if hdl.is_async:
+                return self._exec_handlers_async(ret, handlers[i:], message, target)
+            if hdl.send_ret:
+                self._send_ret(tp, hdl, ret, target)
+        return None
+    
+    async def _exec_handlers_async(
+            self,
+            pending: Awaitable[Any],
+            handlers: HandlerChain,
+            message: Message,
+            target: Optional[BaseNode]
+    ) -> None:
+        tp, hdl = handlers[0]
+        ret = await pending
+        if hdl.send_ret:
+            self._send_ret(tp, hdl, ret, target)
+        pending = self._exec_handlers(handlers[1:], message, target)
+        if pending is not None:
+            await pending
+    
+    def _send_ret(self, tp: type, hdl: MessageHandler, ret: Any, target: Optional[BaseNode]) -> None:
+        data = DataMessage(ret)
+        if target is not None:
+            if not hdl.reflective:
+                self.throw(
+                    kes_exc.UnsupportedMessageError(
+                        f"{tp} is not reflective"
+                    )
                 )
-            )
+            self.send_message(target, data)
+        else:
+            self.pass_down(data)
     
     @on(NodeInitializeMessage)
     def on_initialize(self, message: NodeInitializeMessage) -> None:
@@ -301,10 +488,10 @@ class Node(BaseNode):
     def on_port_set(self, message: PortSet) -> None:
         self._set_port(message.name, message.value)
 
-    __message_handler__ = {
+    __message_handler__ = ChainMap({
         NodeInitializeMessage: on_initialize, NodeFinalizeMessage: on_finalize,
         PortGet: on_port_get, PortSet: on_port_set,
-    }
+    })
         
     @classmethod
     def on(
@@ -320,28 +507,49 @@ class Node(BaseNode):
             self.port_map[name_or_port.name] = name_or_port
     
     def _get_port(self, name: str) -> Any:
-        if name not in self.port_map:
-            self.throw(kes_exc.PortError(f"node {self!r} has not port {name}", name))
-        return self.port_map[name].get()
+        port = self.port_map.get(name)
+        if port is None:
+            self.throw(kes_exc.PortError(("node {!r} has not port {}", self, name), name))
+        return port.get()
     
     def _set_port(self, name: str, value: Any) -> None:
-        if name not in self.port_map:
-            self.throw(kes_exc.PortError(f"node {self!r} has not port {name}", name))
-        return self.port_map[name].set(value)
+        port = self.port_map.get(name)
+        if port is None:
+            self.throw(kes_exc.PortError(("node {!r} has not port {}", self, name), name))
+        return port.set(value)
+    
+    # synchronous port access for callers running in the same event loop,
+    # skipping the PortGet/PortSet message round trip
+    def port_read(self, name: str) -> Any:
+        return self._get_port(name)
+    
+    def port_write(self, name: str, value: Any) -> None:
+        self._set_port(name, value)
 
     def __init_subclass__(cls) -> None:
-        cls.__message_handler__ = cls.__message_handler__.copy()
+        namespace = cls.__dict__
+        cls.__message_handler__ = ChainMap(
+            {i.message_type: i for i in namespace.values() if isinstance(i, MessageHandler)},
+            *(
+                b.__dict__["__message_handler__"].maps[0]
+                for b in cls.__mro__[1:] if "__message_handler__" in b.__dict__
+            )
+        )
+        cls.__message_handler_cache__ = {}
         cls.__export_attr__ = cls.__export_attr__.copy()
+        if "__handle_message__" in namespace:
+            cls._custom_handle_message = True
         super().__init_subclass__()
-        for i in cls.__dict__.values():
-            if isinstance(i, MessageHandler):
-                cls.__message_handler__[i.message_type] = i
-        for k, v in cls.__annotations__.items():
-            if v == Export or (isinstance(v, _AnnotatedAlias) and v.__metadata__ == (AttrPort[T_co],)):  # type: ignore
+        for k, v in _own_annotations(cls).items():
+            if not isinstance(v, _AnnotatedAlias):
+                continue
+            # Export[...] shares the metadata tuple, Annotated[..., AttrPort[T_co]] needs the comparison
+            metadata = v.__metadata__
+            if metadata is _EXPORT_METADATA or metadata == _EXPORT_METADATA:
                 cls.__export_attr__.add(k)
 
 
+from ...logger import logger
 from . import exception as kes_exc
 from .event import Event, NodeDropEvent
-from . import network
 from .network import Network
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Iterator, List, NamedTuple, Protocol, Set
+from heapq import heappop, heappush
+from typing import Dict, Iterator, List, Optional, Protocol, Sequence, Set, Tuple
 
 from .node import BaseNode
 from . import exception as kes_exc
@@ -30,57 +31,116 @@ class AbstractRecordManager(ABC):
     @abstractmethod
     def __iter__(self) -> Iterator[RecordLike]:
         raise NotImplementedError
+    
+    def get_node(self, nid: int) -> BaseNode:
+        return self.get(nid).node
+    
+    def next_nodes(self, nid: int) -> Sequence[BaseNode]:
+        return [self.get_node(i) for i in self.get(nid).next]
+    
+    def connect(self, s_id: int, t_id: int) -> None:
+        self.get(s_id).next.add(t_id)
+    
+    def disconnect(self, nid: int) -> None:
+        for i in self:
+            i.next.discard(nid)
 
     def __len__(self) -> int:
         return len(tuple(self))
     
 
-class NodeRecord(NamedTuple):
-    node: BaseNode
-    next: Set[int]
+class NodeRecord(object):
+    __slots__ = ["node", "next"]
+
+    def __init__(self, node: BaseNode, next: Set[int]) -> None:
+        self.node = node
+        self.next = next
 
 
 class RecordManager(AbstractRecordManager):
-    __slots__ = ["_records", "_id_cache"]
+    __slots__ = ["_nodes", "_next", "_id_cache", "_next_cache"]
 
     def __init__(self) -> None:
         super().__init__()
-        self._records: List[NodeRecord] = []
-        self._id_cache = set()
+        # slots of dropped nodes hold None until the id is reused
+        self._nodes: List[Optional[BaseNode]] = []
+        self._next: List[Set[int]] = []
+        # max-heap of free ids (stored negated)
+        self._id_cache: List[int] = []
+        # resolved successors by node id, invalidated on any topology change;
+        # edges must be added through `connect` to keep it valid
+        self._next_cache: Dict[int, Tuple[BaseNode, ...]] = {}
     
     def get(self, nid: int) -> NodeRecord:
-        if nid < 0 or nid >= len(self._records) or nid in self._id_cache:
-            kes_exc.RuntimeError(f"there is no node with id {nid}").throw()
-        return self._records[nid]
+        return NodeRecord(self.get_node(nid), self._next[nid])
+    
+    def get_node(self, nid: int) -> BaseNode:
+        nodes = self._nodes
+        node = nodes[nid] if 0 <= nid < len(nodes) else None
+        if node is None:
+            kes_exc.RuntimeError(("there is no node with id {}", nid)).throw()
+        return node
     
     def new(self, node: BaseNode) -> int:
-        record = NodeRecord(node, set())
         if self._id_cache:
-            nid = self._id_cache.pop()
-            self._records[nid] = record
+            nid = -heappop(self._id_cache)
+            self._nodes[nid] = node
+            self._next_cache.clear()
         else:
-            nid = len(self._records)
-            self._records.append(
-                NodeRecord(node, set())
-            )
+            nid = len(self._nodes)
+            self._nodes.append(node)
+            self._next.append(set())
         node.nid = nid
         return nid
     
     def drop(self, nid: int) -> BaseNode:
-        if nid == len(self._records) - 1:
-            record = self._records.pop()
-            while (n := len(self._records) - 1) in self._id_cache:
-                self._id_cache.remove(n)
-                self._records.pop()
+        node = self.get_node(nid)
+        nodes = self._nodes
+        id_cache = self._id_cache
+        self._next_cache.clear()
+        if nid == len(nodes) - 1:
+            nodes.pop()
+            self._next.pop()
+            while id_cache and -id_cache[0] == len(nodes) - 1:
+                heappop(id_cache)
+                nodes.pop()
+                self._next.pop()
         else:
-            record = self.get(nid)
-            self._id_cache.add(nid)
-        return record.node
+            nodes[nid] = None
+            self._next[nid].clear()
+            heappush(id_cache, -nid)
+        return node
+    
+    def next_nodes(self, nid: int) -> Tuple[BaseNode, ...]:
+        cached = self._next_cache.get(nid)
+        if cached is not None:
+            return cached
+        nodes = self._nodes
+        size = len(nodes)
+        self.get_node(nid)
+        next_nodes = []
+        for i in sorted(self._next[nid]):
+            node = nodes[i] if 0 <= i < size else None
+            if node is None:
+                kes_exc.RuntimeError(("there is no node with id {}", i)).throw()
+            next_nodes.append(node)
+        cached = self._next_cache[nid] = tuple(next_nodes)
+        return cached
+    
+    def connect(self, s_id: int, t_id: int) -> None:
+        self.get_node(s_id)
+        self._next[s_id].add(t_id)
+        self._next_cache.pop(s_id, None)
+    
+    def disconnect(self, nid: int) -> None:
+        for i in self._next:
+            i.discard(nid)
+        self._next_cache.clear()
     
     def __iter__(self) -> Iterator[NodeRecord]:
-        for i, record in enumerate(self._records):
-            if i not in self._id_cache:
-                yield record
+        for node, next in zip(self._nodes, self._next):
+            if node is not None:
+                yield NodeRecord(node, next)
     
     def __len__(self) -> int:
-        return len(self._records) - len(self._id_cache)
+        return len(self._nodes) - len(self._id_cache)
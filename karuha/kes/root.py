@@ -17,7 +17,7 @@ class KESRootNetwork(RootNetwork):
 
     @on(kes_exc.Event)
     async def on_event(self, event: kes_exc.Event) -> None:
-        if event not in self.event_map and event.mode == kes_evt.EventMode.THROW_ERR:
+        if not self._subscribers(event.__class__) and event.mode == kes_evt.EventMode.THROW_ERR:
             logger.warning(f"unhandled event {event!r}")
         else:
             await super().on_event(event)
@@ -1,4 +1,5 @@
-from typing import Callable, Dict, List, Optional, Tuple, TypeVar, Union
+from types import MappingProxyType
+from typing import Callable, Dict, Final, List, Mapping, Optional, Tuple, Type, TypeVar, Union
 
 from ..logger import logger
 from .drafty import DraftyExtend, Drafty, InlineType, ExtendType
@@ -148,21 +149,34 @@ def _convert_spans(text: str, spans: Optional[List[Span]], /, start: int, end: i
     return TextChain(*content)
 
 
-def _container_converter(text: str, span: Span) -> BaseText:
-    return _Container.tp_map[span.tp](
+# read-only views of the type registries, bound as default args of the converters below
+_CONTAINER_TP_MAP: Final = MappingProxyType(_Container.tp_map)
+_EXTENSION_TP_MAP: Final = MappingProxyType(_ExtensionText.tp_map)
+
+
+def _container_converter(
+        text: str,
+        span: Span,
+        _tp_map: Mapping[str, Type[_Container]] = _CONTAINER_TP_MAP
+) -> BaseText:
+    return _tp_map[span.tp](
         content=_convert_spans(text, span.children, span.start, span.end)
     )  # type: ignore
 
 
-def _attachment_converter(text: str, span: Span) -> BaseText:
+def _attachment_converter(
+        text: str,
+        span: Span,
+        _tp_map: Mapping[str, Type[_ExtensionText]] = _EXTENSION_TP_MAP
+) -> BaseText:
     if span.children:
         logger.warn(f"ignore children of span {span}")
-    return _ExtensionText.tp_map[span.tp](text=text[span.start:span.end], **(span.data or {}))
+    return _tp_map[span.tp](text=text[span.start:span.end], **(span.data or {}))
 
 
-for i in _Container.tp_map:
+for i in _CONTAINER_TP_MAP:
     _converters[i] = _container_converter
-for i in _ExtensionText.tp_map:
+for i in _EXTENSION_TP_MAP:
     _converters[i] = _attachment_converter
 
 
@@ -1,15 +1,35 @@
 from abc import abstractmethod
-from base64 import encodebytes
-from pydantic import AnyHttpUrl, BaseModel, model_validator
-from typing import Any, ClassVar, Dict, Final, List, Literal, MutableMapping, Optional, SupportsIndex, Type, Union
+from base64 import b64encode
+from pydantic import BaseModel, ConfigDict, model_validator
+from typing import Any, Callable, ClassVar, Dict, Final, Literal, MutableMapping, Optional, SupportsIndex, Tuple, Type, Union
 from typing_extensions import Self
 
 from .drafty import Drafty, DraftyFormat, DraftyExtend, ExtendType, InlineType
 
 
+def _function_type_probe() -> None: ...
+
+
+# DraftyFormat is frozen, so line break markers can be shared between messages
+_BR_CACHE_LIMIT: Final = 1024
+_br_cache: Dict[int, DraftyFormat] = {}
+
+
+def _line_break(at: int) -> DraftyFormat:
+    br = _br_cache.get(at)
+    if br is None:
+        br = DraftyFormat(at=at, len=1, tp="BR")
+        if at < _BR_CACHE_LIMIT:
+            _br_cache[at] = br
+    return br
+
+
 class BaseText(BaseModel):
     __slots__ = []
 
+    # methods compiled by Cython are not plain functions and would be taken as fields
+    model_config = ConfigDict(ignored_types=(type(_function_type_probe),))
+
     @abstractmethod
     def to_drafty(self) -> Drafty:
         raise NotImplementedError
@@ -26,15 +46,23 @@ class BaseText(BaseModel):
 
 
 class _Text(BaseText):
+    __slots__ = []
+
     text: str
     
-    def to_drafty(self) -> Drafty:
-        start = 0
+    def to_drafty(self, _br: Callable[[int], DraftyFormat] = _line_break) -> Drafty:
+        text = self.text
         fmt = []
-        while (p := self.text.find('\n', start)) != -1:
-            fmt.append(DraftyFormat(at=p, len=1, tp="BR"))
-            start = p + 1
-        return Drafty(txt=self.text.replace('\n', ' '), fmt=fmt)
+        if '\n' in text:
+            # one split in C instead of a find() call per line
+            fmt_append = fmt.append
+            at = -1
+            for line in text.split('\n')[:-1]:
+                at += len(line) + 1
+                fmt_append(_br(at))
+            text = text.replace('\n', ' ')
+        # passing the lists avoids pydantic copying the field defaults
+        return Drafty(txt=text, fmt=fmt, ent=[])
     
     def __len__(self) -> int:
         return len(self.text)
@@ -44,6 +72,8 @@ class _Text(BaseText):
 
 
 class PlainText(_Text):
+    __slots__ = []
+
     def __init__(self, text: str) -> None:
         super().__init__(text=text)
     
@@ -52,6 +82,8 @@ class PlainText(_Text):
 
 
 class InlineCode(_Text):
+    __slots__ = []
+
     def to_drafty(self) -> Drafty:
         df = super().to_drafty()
         df.fmt.append(DraftyFormat(at=0, len=len(self), tp="CO"))
@@ -59,31 +91,61 @@ class InlineCode(_Text):
     
 
 class TextChain(BaseText):
-    contents: List[BaseText]
+    __slots__ = []
+
+    contents: Tuple[BaseText, ...]
 
     def __init__(self, *args: BaseText) -> None:
-        super().__init__(contents=args)  # type: ignore
+        super().__init__(contents=args)
     
     def __getitem__(self, key: SupportsIndex, /) -> BaseText:
         return self.contents[key]
 
-    def to_drafty(self) -> Drafty:
+    def to_drafty(self, _DF: Type[DraftyFormat] = DraftyFormat) -> Drafty:
         if not self.contents:
-            return Drafty(txt=" ")
-        it = iter(self.contents)
-        base = next(it).to_drafty()
-        for i in it:
-            base += i.to_drafty()
-        return base
+            return Drafty(txt=" ", fmt=[], ent=[])
+        # merge all parts in one pass instead of rebasing a growing Drafty per part
+        txt = []
+        fmt = []
+        ent = []
+        fmt_append = fmt.append
+        offset = 0
+        for i in self.contents:
+            df = i.to_drafty()
+            keys = []
+            for e in df.ent:
+                for k, v in enumerate(ent):
+                    if v == e:
+                        break
+                else:
+                    k = len(ent)
+                    ent.append(e)
+                keys.append(k)
+            for f in df.fmt:
+                at = f.at if f.at < 0 else f.at + offset
+                key = f.key
+                if f.tp is None and key < len(keys):
+                    key = keys[key]
+                if at == f.at and key == f.key:
+                    fmt_append(f)
+                elif f.tp == "BR":
+                    fmt_append(_line_break(at))
+                else:
+                    fmt_append(_DF(at=at, len=f.len, key=key, tp=f.tp))
+            txt.append(df.txt)
+            offset += len(df.txt)
+        return Drafty(txt=''.join(txt), fmt=fmt, ent=ent)
     
     def __repr__(self) -> str:
         return f"<{self.__class__.__name__} {self.contents}>"
 
     def __str__(self) -> str:
-        return ''.join(str(i) for i in self.contents)
+        return ''.join([str(i) for i in self.contents])
 
 
 class _Container(BaseText):
+    __slots__ = []
+
     tp_map: ClassVar[Dict[str, Type["_Container"]]] = {}
 
     type: InlineType
@@ -108,30 +170,44 @@ class _Container(BaseText):
 
 
 class Bold(_Container):
+    __slots__ = []
+
     type: Final[InlineType] = "ST"
     
 
 class Italic(_Container):
+    __slots__ = []
+
     type: Final[InlineType] = "EM"
     
 
 class Strikethrough(_Container):
+    __slots__ = []
+
     type: Final[InlineType] = "DL"
 
 
 class Highlight(_Container):
+    __slots__ = []
+
     type: Final[InlineType] = "HL"
 
 
 class Hidden(_Container):
+    __slots__ = []
+
     type: Final[InlineType] = "HD"
     
 
 class Row(_Container):
+    __slots__ = []
+
     type: Final[InlineType] = "RW"
 
 
 class Form(_Container):
+    __slots__ = []
+
     type: Final[InlineType] = "FM"
 
     su: bool = False
@@ -148,6 +224,8 @@ class Form(_Container):
 
 
 class _ExtensionText(_Text):
+    __slots__ = []
+
     tp_map: ClassVar[Dict[str, Type["_ExtensionText"]]] = {}
 
     type: ExtendType
@@ -157,8 +235,13 @@ class _ExtensionText(_Text):
         raise NotImplementedError
     
     def to_drafty(self) -> Drafty:
-        df = super().to_drafty()
-        length = len(self)
+        text = self.text
+        if '\n' in text:
+            df = super().to_drafty()
+        else:
+            # the usual case for mentions, hashtags and attachments
+            df = Drafty(txt=text, fmt=[], ent=[])
+        length = len(text)
         df.fmt.append(DraftyFormat(at=0 if length else -1, len=length))
         df.ent.append(DraftyExtend(tp=self.type, data=self.get_data()))
         return df
@@ -171,14 +254,27 @@ class _ExtensionText(_Text):
 
 
 class Link(_ExtensionText):
+    __slots__ = []
+
     type: Final[ExtendType] = "LN"
-    url: AnyHttpUrl
+    url: str
+
+    # only the scheme is checked, set to False to accept any url
+    validate_url: ClassVar[bool] = True
+
+    @model_validator(mode="after")
+    def check_url(self) -> Self:
+        if self.validate_url and not self.url[:8].lower().startswith(("http://", "https://")):
+            raise ValueError(f"invalid http url {self.url!r}")
+        return self
 
     def get_data(self) -> Dict[str, Any]:
         return {"url": self.url}
     
 
 class Mention(_ExtensionText):
+    __slots__ = []
+
     type: Final[ExtendType] = "MN"
 
     val: str
@@ -188,6 +284,8 @@ class Mention(_ExtensionText):
     
 
 class Hashtag(_ExtensionText):
+    __slots__ = []
+
     type: Final[ExtendType] = "HT"
 
     val: str
@@ -197,6 +295,8 @@ class Hashtag(_ExtensionText):
 
 
 class Button(_ExtensionText):
+    __slots__ = []
+
     type: Final[ExtendType] = "BN"
 
     name: Optional[str] = None
@@ -211,7 +311,15 @@ class Button(_ExtensionText):
         return self
 
     def get_data(self) -> Dict[str, Any]:
-        return self.model_dump(include={"name", "val", "act", "ref"}, exclude_none=True)
+        data = {}
+        if self.name is not None:
+            data["name"] = self.name
+        if self.val is not None:
+            data["val"] = self.val
+        data["act"] = self.act
+        if self.ref is not None:
+            data["ref"] = self.ref
+        return data
     
     def __str__(self) -> str:
         if self.name is None:
@@ -222,6 +330,8 @@ class Button(_ExtensionText):
 
 
 class VideoCall(_ExtensionText):
+    __slots__ = []
+
     type: ExtendType = "VC"
 
     duration: int
@@ -230,10 +340,18 @@ class VideoCall(_ExtensionText):
     aonly: bool
 
     def get_data(self) -> Dict[str, Any]:
-        return self.dict(include={"duration", "state", "incoming", "aonly"})
+        return {
+            "duration": self.duration, "state": self.state,
+            "incoming": self.incoming, "aonly": self.aonly
+        }
+
+
+_ATTACHMENT_SKIP: Final = frozenset(("text", "type"))
 
 
 class _Attachment(_ExtensionText):
+    __slots__ = []
+
     text: str = ""
     type: ExtendType
 
@@ -245,10 +363,11 @@ class _Attachment(_ExtensionText):
 
     @model_validator(mode="before")
     def convert_raw(cls, data: Any) -> Any:
-        if isinstance(data, MutableMapping):
-            for k, v in data.items():
-                if isinstance(k, str) and isinstance(v, bytes) and k.startswith("raw_"):
-                    data[k] = encodebytes(v).decode("ascii")
+        if not isinstance(data, MutableMapping):
+            return data
+        for k, v in data.items():
+            if type(v) is bytes and isinstance(k, str) and k.startswith("raw_"):
+                data[k] = b64encode(v).decode("ascii")
         return data
 
     @model_validator(mode="after")
@@ -258,7 +377,8 @@ class _Attachment(_ExtensionText):
         return self
 
     def get_data(self) -> Dict[str, Any]:
-        return self.model_dump(exclude={"text", "type"}, exclude_none=True)
+        # field values live in __dict__, which is cheaper to walk than model_dump
+        return {k: v for k, v in self.__dict__.items() if v is not None and k not in _ATTACHMENT_SKIP}
     
     def __str__(self) -> str:
         name = self.__class__.__name__
@@ -273,12 +393,16 @@ class _Attachment(_ExtensionText):
 
 
 class File(_Attachment):
+    __slots__ = []
+
     type: Final[ExtendType] = "EX"
     
     mime: str = "text/plain"
 
 
 class Image(_Attachment):
+    __slots__ = []
+
     type: Final[ExtendType] = "IM"
 
     mime: str = "image/png"
@@ -287,6 +411,8 @@ class Image(_Attachment):
 
 
 class Audio(_Attachment):
+    __slots__ = []
+
     type: Final[ExtendType] = "AU"
 
     mime: str = "audio/aac"
@@ -295,6 +421,8 @@ class Audio(_Attachment):
 
 
 class Video(_Attachment):
+    __slots__ = []
+
     type: Final[ExtendType] = "VD"
 
     mime: str = "video/webm"
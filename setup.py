@@ -14,6 +14,7 @@ See the License for the specific language governing permissions and
 limitations under the License.
 """
 
+import os
 import re
 import sys
 import warnings
@@ -35,6 +36,20 @@ try:
 except Exception as e:
     raise ValueError("fail to read karuha version") from e
 
+# Compiling the drafty-building module with Cython is opt-in,
+# a source install without the variable stays pure python.
+ext_modules = []
+if os.environ.get("KARUHA_ENABLE_CYTHON") == "1":
+    try:
+        from Cython.Build import cythonize
+    except ImportError:
+        warnings.warn("Cython is not installed, build without compiled modules.", RuntimeWarning)
+    else:
+        ext_modules = cythonize(
+            ["karuha/text/textchain.py"],
+            compiler_directives={"language_level": 3, "binding": True}
+        )
+
 setup(
     name="KaruhaBot",
     version=version,
@@ -50,6 +65,7 @@ setup(
 
     url="https://github.com/Ovizro/Karuha",
     packages=find_packages(),
+    ext_modules=ext_modules,
     python_requires=">=3.8",
     install_requires=[
         "typing_extensions>=4.0" if sys.version_info >= (3, 7)
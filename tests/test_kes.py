@@ -1,8 +1,14 @@
+import asyncio
+from typing import Any
+from typing_extensions import Annotated
 from unittest import IsolatedAsyncioTestCase
 
-from karuha.kes import Network, Node, kes_msg, kes_evt
+from karuha.kes import Network, Node, kes_msg, kes_evt, kes_exc
+from karuha.kes.core import on, Export, HandlerFlag
+from karuha.kes.core.node import AttrPort, T_co, MessageHandler, get_curr_node, get_curr_message
 from karuha.kes.core import network
-from karuha.kes.builtin.phantom import PhantomNetworkManager
+from karuha.kes.core.record import RecordManager
+from karuha.kes.builtin.phantom import PhantomNetwork, PhantomNetworkManager
 from karuha.kes.root import root_net
 from karuha.kes.api import kes_init
 
@@ -15,12 +21,35 @@ class TestKES(IsolatedAsyncioTestCase):
         self.assertGreaterEqual(len(Node.__message_handler__), 4)
         self.assertGreaterEqual(len(Network.__message_handler__), 7)
         self.assertIs(Node.on_port_get.message_type, kes_msg.PortGet)
-        del Node.on_port_set.__orig_class__
+        self.assertIsInstance(kes_msg.INITIALIZE_MESSAGE, kes_msg.NodeInitializeMessage)
+        self.assertFalse(hasattr(kes_msg.PortGet("net"), "__weakref__"))
         self.assertIs(Node.on_port_set.message_type, kes_msg.PortSet)
+        func = Node.on_port_set.__func__
+        self.assertIs(MessageHandler[kes_msg.PortSet](func).message_type, kes_msg.PortSet)
+        self.assertIs(MessageHandler(func).message_type, kes_msg.PortSet)
         ph_net = network.phantom_net_factory()
         self.assertIs(root_net._get_port("phantom_net"), ph_net)
         self.assertIs(root_net.records.get(1).node, ph_net)
     
+    def test_message_slots(self) -> None:
+        def walk(cls):
+            yield cls
+            for i in cls.__subclasses__():
+                yield from walk(i)
+
+        for i in walk(kes_msg.Message):
+            if i.__module__.startswith("karuha.kes."):
+                self.assertFalse(i.__dictoffset__, f"{i.__qualname__} instance has __dict__")
+        self.assertFalse(hasattr(kes_evt.NodeDropEvent(0), "__dict__"))
+        self.assertFalse(hasattr(kes_exc.ValueError("test"), "__dict__"))
+    
+    def test_exception_text(self) -> None:
+        exc = kes_exc.PortError(("node {!r} has not port {}", None, "test"), "test")
+        self.assertIsInstance(exc._text, tuple)
+        self.assertEqual(exc.text, "node None has not port test")
+        self.assertEqual(exc._text, exc.text)
+        self.assertEqual(kes_exc.ValueError("test").text, "test")
+    
     async def test_record(self) -> None:
         node1 = Node(root_net)
         self.assertFalse(hasattr(node1, "nid"))
@@ -30,6 +59,42 @@ class TestKES(IsolatedAsyncioTestCase):
         with self.assertRaises(RuntimeError):
             root_net.records.get(node2.nid)
     
+    def test_record_manager(self) -> None:
+        rm = RecordManager()
+        nodes = [Node(root_net) for _ in range(4)]
+        self.assertListEqual([rm.new(i) for i in nodes], [0, 1, 2, 3])
+        self.assertIs(rm.drop(1), nodes[1])
+        self.assertEqual(len(rm), 3)
+        with self.assertRaises(RuntimeError):
+            rm.get_node(1)
+        self.assertListEqual([i.node for i in rm], [nodes[0], nodes[2], nodes[3]])
+        rm.drop(2)
+        rm.drop(3)
+        self.assertEqual(len(rm), 1)
+        self.assertIs(rm.get_node(0), nodes[0])
+        with self.assertRaises(RuntimeError):
+            rm.get(1)
+        self.assertEqual(rm.new(nodes[1]), 1)
+        rm.drop(0)
+        rm.drop(1)
+        self.assertEqual(len(rm), 0)
+        self.assertFalse(rm._nodes)
+    
+    def test_record_next(self) -> None:
+        rm = RecordManager()
+        nodes = [Node(root_net) for _ in range(3)]
+        for i in nodes:
+            rm.new(i)
+        rm.connect(0, 2)
+        rm.connect(0, 1)
+        self.assertTupleEqual(rm.next_nodes(0), (nodes[1], nodes[2]))
+        self.assertIs(rm.next_nodes(0), rm.next_nodes(0))
+        rm.disconnect(1)
+        self.assertTupleEqual(rm.next_nodes(0), (nodes[2],))
+        rm.drop(2)
+        with self.assertRaises(RuntimeError):
+            rm.next_nodes(0)
+    
     def test_phantom(self) -> None:
         rdm = PhantomNetworkManager()
         node0 = Node(root_net)
@@ -41,9 +106,281 @@ class TestKES(IsolatedAsyncioTestCase):
             rdm.get(0)
         node1 = Node(root_net)
         rdm.new(node1)
-        self.assertEqual(node1.nid, 1)
+        self.assertEqual(node1.nid, 0)
+        node2 = Node(root_net)
+        rdm.new(node2)
+        self.assertEqual(node2.nid, 1)
+        self.assertEqual(len(rdm), 2)
+        self.assertIs(rdm.get_node(1), node2)
+        self.assertIs(rdm.drop(1), node2)
+        self.assertListEqual([i.node for i in rdm], [node1, node2])
     
     async def test_root(self) -> None:
         root_net.node_new(Network)
         root_net
-        
\ No newline at end of file
+        
+
+class _RecordNode(Node):
+    __slots__ = ["received"]
+
+    def __init__(self, net: Network, /) -> None:
+        super().__init__(net)
+        self.received = []
+
+    @on(kes_msg.DataMessage)
+    def on_data(self, message: kes_msg.DataMessage) -> None:
+        self.received.append(message.data)
+
+
+class TestDispatch(IsolatedAsyncioTestCase):
+    async def test_inbox(self) -> None:
+        node = _RecordNode(root_net)
+        for i in range(100):
+            node.send_message(node, kes_msg.DataMessage(i))
+        self.assertEqual(len(node._inbox), 100)
+        while node._worker is not None:
+            await asyncio.sleep(0)
+        self.assertListEqual(node.received, list(range(100)))
+        self.assertIsNone(node.handle_message(kes_msg.DataMessage(100)))
+        self.assertEqual(node.received[-1], 100)
+
+    def test_handler_cache(self) -> None:
+        handlers, sync, reflect = _RecordNode._resolve_handlers(kes_msg.DataMessage)
+        self.assertTrue(sync)
+        self.assertFalse(reflect)
+        self.assertTrue(_RecordNode._resolve_handlers(kes_msg.ReflectMessage)[2])
+        self.assertEqual(len(handlers), 1)
+        self.assertIs(_RecordNode._resolve_handlers(kes_msg.DataMessage)[0], handlers)
+        self.assertNotIn(kes_msg.DataMessage, Node.__message_handler_cache__)
+
+        @_RecordNode.on(kes_msg.DataMessage)
+        async def on_data(self, message: kes_msg.DataMessage) -> None:
+            pass
+
+        self.assertFalse(_RecordNode.__message_handler_cache__)
+        self.assertFalse(_RecordNode._resolve_handlers(kes_msg.DataMessage)[1])
+        _RecordNode.on(kes_msg.DataMessage)(_RecordNode.on_data)
+    
+    def test_handler_layers(self) -> None:
+        class PortNode(Node):
+            @on(kes_msg.PortExportAttr)
+            def on_export(self, message: kes_msg.PortExportAttr) -> None:
+                pass
+
+        class MixedNode(_RecordNode, PortNode):
+            pass
+
+        self.assertNotIn(kes_msg.DataMessage, MixedNode.__message_handler__.maps[0])
+        self.assertIn(kes_msg.DataMessage, MixedNode.__message_handler__)
+        self.assertIn(kes_msg.PortExportAttr, MixedNode.__message_handler__)
+        self.assertIs(MixedNode.__message_handler__[kes_msg.PortGet], Node.on_port_get)
+
+        handlers = MixedNode._resolve_handlers(kes_msg.PortExportAttr)[0]
+        self.assertEqual(len(handlers), 1)
+        PortNode.on(kes_msg.PortExportAttr)(PortNode.on_export.__func__)
+        self.assertFalse(MixedNode.__message_handler_cache__)
+        self.assertIsNot(MixedNode._resolve_handlers(kes_msg.PortExportAttr)[0], handlers)
+    
+    def test_export_attr(self) -> None:
+        class ExportNode(_RecordNode):
+            value: Export[int]
+            spelled: Annotated[int, AttrPort[T_co]]
+            plain: int
+
+        self.assertSetEqual(ExportNode.__export_attr__, {"value", "spelled"})
+        self.assertIn(kes_msg.DataMessage, ExportNode.__message_handler__)
+
+    async def test_inbox_size(self) -> None:
+        ph_net = network.phantom_net_factory()
+        self.assertEqual(ph_net._inbox.maxlen, 4096)
+        self.assertIsNone(root_net._inbox.maxlen)
+
+        class SmallPhantomNetwork(PhantomNetwork):
+            inbox_size = 2
+
+        small_net = SmallPhantomNetwork(root_net)
+        net = Network(root_net)
+        nodes = [net._node_alloc(Node) for _ in range(5)]
+        for i in nodes:
+            net._node_transfer(i.nid, small_net)
+        self.assertEqual(len(small_net._inbox), 2)
+        await small_net._worker
+        self.assertFalse(net.records)
+        self.assertTrue(all(i.net is small_net for i in nodes))
+        self.assertListEqual(sorted(i.nid for i in nodes), list(range(5)))
+
+        with self.assertLogs("Karuha", "WARNING") as cm:
+            for i in range(4):
+                small_net.send_message(small_net, kes_msg.DataMessage(i))
+        self.assertEqual(len(cm.records), 2)
+        self.assertListEqual([i.data for i in small_net._inbox], [2, 3])
+        small_net._inbox.clear()
+    
+    async def test_inline(self) -> None:
+        node = _RecordNode(root_net)
+        self.assertTrue(node.try_handle_inline(kes_msg.DataMessage(0)))
+        self.assertListEqual(node.received, [0])
+        node.send_message(node, kes_msg.DataMessage(1))
+        self.assertFalse(node.try_handle_inline(kes_msg.DataMessage(2)))
+        self.assertFalse(node.try_handle_inline(kes_msg.PortGet("net")))
+
+    async def test_handler_error(self) -> None:
+        class CatchNet(Network):
+            @on(kes_exc.PyKernelError)
+            def on_kernel_error(self, exc: kes_exc.PyKernelError) -> None:
+                caught.append(exc.py_exc)
+
+        class FailNode(Node):
+            @on(kes_msg.DataMessage)
+            def on_data(self, message: kes_msg.DataMessage) -> None:
+                raise KeyError(message.data)
+
+        caught = []
+        net = CatchNet(root_net)
+        node = FailNode(net)
+        with self.assertLogs("Karuha", "ERROR"):
+            self.assertTrue(node.try_handle_inline(kes_msg.DataMessage(0)))
+            node.send_message(node, kes_msg.DataMessage(1))
+            await node._worker
+        if net._worker is not None:
+            await net._worker
+        self.assertListEqual([i.args for i in caught], [(0,), (1,)])
+
+    async def test_mixed_chain(self) -> None:
+        class SubMessage(kes_msg.DataMessage):
+            __slots__ = []
+
+        class MixedNode(Node):
+            @on(SubMessage, flag=HandlerFlag.PROPAGATE)
+            async def on_sub(self, message: SubMessage) -> None:
+                await asyncio.sleep(0)
+                message.data.append("async")
+
+            @on(kes_msg.DataMessage)
+            def on_data(self, message: kes_msg.DataMessage) -> None:
+                message.data.append("sync")
+
+        node = MixedNode(root_net)
+        message = SubMessage([])
+        self.assertFalse(node.try_handle_inline(message))
+        await node.__handle_message__(message)
+        self.assertListEqual(message.data, ["async", "sync"])
+
+    async def test_handle_message_override(self) -> None:
+        class OverrideNode(_RecordNode):
+            async def __handle_message__(self, message: kes_msg.Message, /, **kwds) -> None:
+                seen.append(message.__class__)
+                await super().__handle_message__(message, **kwds)
+
+        class SubOverrideNode(OverrideNode):
+            pass
+
+        seen = []
+        self.assertFalse(_RecordNode._custom_handle_message)
+        self.assertTrue(SubOverrideNode._custom_handle_message)
+        node = SubOverrideNode(root_net)
+        self.assertFalse(node.try_handle_inline(kes_msg.DataMessage(0)))
+        node.send_message(node, kes_msg.INITIALIZE_MESSAGE)
+        node.send_message(node, kes_msg.DataMessage(1))
+        await node._worker
+        self.assertListEqual(seen, [kes_msg.NodeInitializeMessage, kes_msg.DataMessage])
+        self.assertListEqual(node.received, [1])
+
+    async def test_curr_message(self) -> None:
+        class CurrNode(Node):
+            @on(kes_msg.DataMessage)
+            def on_data(self, message: kes_msg.DataMessage) -> None:
+                message.data.append((get_curr_node(), get_curr_message()))
+
+        node = CurrNode(root_net)
+        msg = kes_msg.DataMessage([])
+        self.assertTrue(node.try_handle_inline(msg))
+        node.send_message(node, msg)
+        await node._worker
+        self.assertListEqual(msg.data, [(node, msg), (node, msg)])
+        self.assertIsNone(node._curr_message)
+        with self.assertRaises(RuntimeError):
+            get_curr_message()
+
+    async def test_event_dispatch(self) -> None:
+        net = Network(root_net)
+        node = _RecordNode(net)
+        net._register_event(kes_evt.NodeDropEvent, node)
+        await net.on_event(kes_evt.NodeDropEvent(3))
+        self.assertIn(kes_evt.NodeDropEvent, net._dispatch_cache)
+        net._register_event(kes_evt.Event, node)
+        self.assertFalse(net._dispatch_cache)
+        self.assertListEqual(net._build_dispatch(kes_evt.NodeDropEvent), [node, node])
+
+        class UnhandledEvent(kes_evt.Event):
+            __slots__ = []
+            mode = kes_evt.EventMode.THROW_ERR
+
+        subscribers = root_net._subscribers(UnhandledEvent)
+        with self.assertLogs("Karuha", "WARNING"):
+            await root_net.on_event(UnhandledEvent())
+        self.assertIs(root_net._subscribers(UnhandledEvent), subscribers)
+
+    async def test_event_traceback(self) -> None:
+        class TraceNode(Node):
+            __slots__ = ["seen"]
+
+            def __init__(self, net: Network, /) -> None:
+                super().__init__(net)
+                self.seen = []
+
+            @on(kes_evt.NodeDropEvent)
+            def on_drop(self, event: kes_evt.NodeDropEvent) -> None:
+                self.seen.append((event, list(event.traceback)))
+
+            @on(kes_msg.DataMessage)
+            def on_data(self, message: kes_msg.DataMessage) -> None:
+                pass
+
+        net = Network(root_net)
+        inline = TraceNode(net)
+        queued = TraceNode(net)
+        net._register_event(kes_evt.NodeDropEvent, inline)
+        net._register_event(kes_evt.NodeDropEvent, queued)
+        # a pending message keeps the second subscriber from handling inline
+        queued.send_message(queued, kes_msg.DataMessage(None))
+        event = kes_evt.NodeDropEvent(0)
+        self.assertTrue(event.is_primary)
+        await net.on_event(event)
+        self.assertListEqual(event.traceback, [])
+        await net.on_event(event)
+        await queued._worker
+        self.assertListEqual([i for _, i in inline.seen], [[net], [net]])
+        self.assertListEqual([i for _, i in queued.seen], [[net], [net]])
+        self.assertIs(inline.seen[0][0], event)
+        self.assertIsNot(queued.seen[0][0], event)
+        self.assertTrue(event.is_primary)
+
+    def test_port_access(self) -> None:
+        class ComputedNode(_RecordNode):
+            def _get_port(self, name: str) -> Any:
+                if name == "count":
+                    return len(self.received)
+                return super()._get_port(name)
+
+            def _set_port(self, name: str, value: Any) -> None:
+                if name == "count":
+                    self.received = [None] * value
+                    return
+                super()._set_port(name, value)
+
+        node = ComputedNode(root_net)
+        node._export("received")
+        node.port_write("count", 3)
+        self.assertEqual(node.port_read("count"), 3)
+        self.assertIs(node.port_read("received"), node.received)
+
+    async def test_reflect(self) -> None:
+        node = _RecordNode(root_net)
+        node._export("received")
+        receiver = _RecordNode(root_net)
+        message = kes_msg.ReflectMessage(receiver, kes_msg.PortGet("received"))
+        self.assertIsNone(node.handle_message(message))
+        while receiver._worker is not None:
+            await asyncio.sleep(0)
+        self.assertListEqual(receiver.received, [node.received])
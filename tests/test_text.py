@@ -1,5 +1,7 @@
 from unittest import TestCase
-from karuha.text import PlainText, Form, Drafty, drafty2tree, drafty2text
+from pydantic import ValidationError
+from karuha.text import (PlainText, Form, Drafty, drafty2tree, drafty2text, TextChain, Bold, Mention, Hashtag,
+                         Button, VideoCall, Link, Image)
 from karuha.text.convert import eval_spans, to_span_tree
 
 
@@ -85,3 +87,48 @@ class TestText(TestCase):
         self.assertLessEqual(df2.fmt, example2.fmt)
         # print(df1.model_dump_json(indent=4))
         self.assertSetEqual(set(df1.fmt), set(example1.fmt))
+
+    def test_newline(self) -> None:
+        df = PlainText("\n\nab\nc").to_drafty()
+        self.assertEqual(df.txt, "  ab c")
+        self.assertListEqual([i.at for i in df.fmt], [0, 1, 4])
+        self.assertTrue(all(i.tp == "BR" and i.len == 1 for i in df.fmt))
+        self.assertFalse(PlainText("abc").to_drafty().fmt)
+        self.assertIs(PlainText("\n").to_drafty().fmt[0], PlainText("\n").to_drafty().fmt[0])
+        long_text = "x" * 2000 + "\n"
+        self.assertEqual(PlainText(long_text).to_drafty().fmt[0].at, 2000)
+
+    def test_chain_entities(self) -> None:
+        chain = TextChain(
+            PlainText("a\n"),
+            Mention(text="@x", val="x"),
+            Bold(content=TextChain(PlainText("b"), Mention(text="@x", val="x"))),
+            Hashtag(text="#h", val="h"),
+        )
+        self.assertIsInstance(chain.contents, tuple)
+        self.assertIsInstance(chain[2], Bold)
+        df = chain.to_drafty()
+        self.assertEqual(df.txt, "a @xb@x#h")
+        self.assertListEqual([i.tp for i in df.ent], ["MN", "HT"])
+        self.assertListEqual(
+            [(i.at, i.key) for i in df.fmt if i.tp is None],
+            [(2, 0), (5, 0), (7, 1)]
+        )
+
+    def test_extension_data(self) -> None:
+        self.assertDictEqual(Button(text="ok").get_data(), {"act": "pub"})
+        btn = Button(text="go", name="go", act="url", ref="https://example.com")
+        self.assertDictEqual(btn.get_data(), {"name": "go", "act": "url", "ref": "https://example.com"})
+        call = VideoCall(text="", duration=3, state="busy", incoming=True, aonly=False)
+        self.assertDictEqual(call.get_data(), {"duration": 3, "state": "busy", "incoming": True, "aonly": False})
+        image = Image(ref="https://example.com/a.png", width=4, height=3)
+        self.assertDictEqual(
+            image.get_data(),
+            {"mime": "image/png", "ref": "https://example.com/a.png", "width": 4, "height": 3}
+        )
+
+    def test_link(self) -> None:
+        link = Link(text="example", url="https://www.example.com/abc#fragment")
+        self.assertDictEqual(link.get_data(), {"url": "https://www.example.com/abc#fragment"})
+        with self.assertRaises(ValidationError):
+            Link(text="example", url="ftp://www.example.com")